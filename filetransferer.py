@@ -1,41 +1,296 @@
-import os
-import shutil
-from concurrent.futures import ThreadPoolExecutor
-from tqdm import tqdm
-from threading import Lock
-
-def copy_file(s, d, pbar, lock):
-    os.makedirs(os.path.dirname(d), exist_ok=True)
-    shutil.copy2(s, d)
-    size = os.path.getsize(s)
-    with lock:
-        pbar.update(size)
-
-def foldercopy(src, dst):
-    totalsize = 0
-    size = os.path.getsize(src)#stores source folder size
-    dst_folder = os.path.join(dst, os.path.basename(src)) #stores distribution folder path
-
-    #adding all source folder file paths into files=[]
-    files = []
-    for root, _, fs in os.walk(src):
-        rel = os.path.relpath(root, src)
-        for f in fs:
-            s = os.path.join(root, f)
-            d = os.path.join(dst_folder, rel, f)
-            files.append((s, d))
-            totalsize += size
-
-    #passing each path through copy_file while threading 
-    lock = Lock()
-    with tqdm(total=totalsize, unit="B",unit_scale=True, mininterval=0.0) as pbar:
-        with ThreadPoolExecutor() as thread:
-            thread.map(lambda x: copy_file(*x, pbar, lock), files)
-
-if __name__ == "__main__":
-    src = input("Source folder: ").strip()
-    #dst = input("Destination folder: ").strip()
-    #src = "C:\AAAtest"
-    dst = "C:\BBBtest"
-
-    foldercopy(src, dst)
+import os
+import sys
+import errno
+import stat
+import ctypes
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+import threading
+
+try:
+    import fcntl
+except ImportError: #Windows
+    fcntl = None
+
+BATCH_SIZE = 32 #files handed to a worker per submission
+WORKERS = min(32, (os.cpu_count() or 1) + 4) #ThreadPoolExecutor's own default, the tar stream and batches share it
+FLUSH_BYTES = 1 << 24 #progress is pushed to the bar every 16 MiB per worker
+SPLICE_CHUNK = 1 << 20 #bytes moved through the pipe per splice round trip
+COLD_COPY_THRESHOLD = 64 << 20 #files this large are dropped from the page cache after copying
+SMALL_FILE = 64 << 10 #files below this go through the tar stream instead of a copy each
+#our own archive, keep modes as-is on Pythons that filter extraction
+EXTRACT_ARGS = {"filter": "fully_trusted"} if hasattr(tarfile, "fully_trusted_filter") else {}
+
+progress_acc = threading.local()
+
+def report(pbar, n): #add n bytes to this worker's accumulator, flushing it into the bar when large enough
+    acc = getattr(progress_acc, "n", 0) + n
+    if acc >= FLUSH_BYTES:
+        flush(pbar, acc)
+        acc = 0
+    progress_acc.n = acc
+
+def flush(pbar, n=None): #push the worker's pending bytes to the shared bar
+    if n is None:
+        n, progress_acc.n = getattr(progress_acc, "n", 0), 0
+    if n:
+        with pbar.get_lock():
+            pbar.update(n)
+
+def copy_file_posix(s, d, size, pbar): #in-kernel copy chain, destination directory must already exist
+    sfd = os.open(s, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        st = os.fstat(sfd)
+        dfd = os.open(d, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+        try:
+            if size >= COLD_COPY_THRESHOLD:
+                advise(sfd, "POSIX_FADV_SEQUENTIAL")
+            kernel_copy(sfd, dfd, size, pbar)
+            if size >= COLD_COPY_THRESHOLD:
+                advise(sfd, "POSIX_FADV_DONTNEED")
+                advise(dfd, "POSIX_FADV_DONTNEED") #starts writeback, drops what's already clean
+        finally:
+            os.close(dfd)
+    finally:
+        os.close(sfd)
+    #replicate copy2 metadata
+    os.utime(d, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.chmod(d, stat.S_IMODE(st.st_mode))
+
+def copy_file_darwin(s, d, size, pbar): #libSystem copyfile(3), clones on APFS and copies metadata itself
+    try:
+        os.unlink(d) #COPYFILE_CLONE implies COPYFILE_EXCL
+    except FileNotFoundError:
+        pass
+    if libsystem.copyfile(os.fsencode(s), os.fsencode(d), None, COPYFILE_ALL | COPYFILE_CLONE) < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), s)
+    report(pbar, size)
+
+def copy_file_windows(s, d, size, pbar): #kernel32 CopyFileExW, copies attributes and timestamps itself
+    flags = COPY_FILE_ALLOW_DECRYPTED_DESTINATION
+    if size >= COLD_COPY_THRESHOLD:
+        flags |= COPY_FILE_NO_BUFFERING #unbuffered I/O for large one-shot copies
+    if not kernel32.CopyFileExW(s, d, None, None, None, flags):
+        raise ctypes.WinError(ctypes.get_last_error())
+    report(pbar, size)
+
+#picking the fastest native copy once, at import
+if sys.platform == "darwin":
+    COPYFILE_ALL = 0xF #ACL | STAT | XATTR | DATA
+    COPYFILE_CLONE = 1 << 24
+    libsystem = ctypes.CDLL("/usr/lib/libSystem.B.dylib", use_errno=True)
+    libsystem.copyfile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p, ctypes.c_uint32]
+    libsystem.copyfile.restype = ctypes.c_int
+    copy_file = copy_file_darwin
+elif sys.platform == "win32":
+    from ctypes import wintypes
+    COPY_FILE_ALLOW_DECRYPTED_DESTINATION = 0x8
+    COPY_FILE_NO_BUFFERING = 0x1000
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CopyFileExW.argtypes = [wintypes.LPCWSTR, wintypes.LPCWSTR, ctypes.c_void_p, ctypes.c_void_p, wintypes.LPBOOL, wintypes.DWORD]
+    kernel32.CopyFileExW.restype = wintypes.BOOL
+    copy_file = copy_file_windows
+else:
+    copy_file = copy_file_posix
+
+def advise(fd, advice): #posix_fadvise over the whole file, where the platform has it
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+
+def copy_batch(srcs, dsts, sizes, start, stop, pbar): #copy files [start, stop) on one worker, returns the number that failed
+    failed = 0
+    try:
+        for i in range(start, stop):
+            try:
+                copy_file(srcs[i], dsts[i], sizes[i], pbar)
+            except OSError as e:
+                pbar.write(f"Error {srcs[i]}: {e}")
+                failed += 1
+    finally:
+        flush(pbar)
+    return failed
+
+def iter_tree(src, dst_root): #recursive scandir, yields (src_path, dst_path, size, mtime_ns) for every file
+    try:
+        it = os.scandir(src)
+    except OSError as e: #unreadable folder, skipped like os.walk did
+        print(f"Skipped folder {src}: {e}")
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_tree(entry.path, os.path.join(dst_root, entry.name))
+            elif entry.is_file():
+                try:
+                    st = entry.stat()
+                except OSError as e: #vanished or unreadable since the listing
+                    print(f"Skipped {entry.path}: {e}")
+                    continue
+                yield entry.path, os.path.join(dst_root, entry.name), st.st_size, st.st_mtime_ns
+
+def open_pipe(): #pipe for splice, widened to one chunk where the kernel allows it
+    r, w = os.pipe()
+    if fcntl is not None and hasattr(fcntl, "F_SETPIPE_SZ"):
+        try:
+            fcntl.fcntl(w, fcntl.F_SETPIPE_SZ, SPLICE_CHUNK)
+        except OSError:
+            pass
+    return r, w
+
+def splice_chunk(sfd, dfd, pipe): #src -> pipe -> dst, the pages never enter userspace
+    r, w = pipe
+    n = os.splice(sfd, w, SPLICE_CHUNK, flags=os.SPLICE_F_MOVE)
+    left = n
+    while left:
+        left -= os.splice(r, dfd, left, flags=os.SPLICE_F_MOVE)
+    return n
+
+def kernel_copy(sfd, dfd, size, pbar): #copy_file_range, then splice, then sendfile, then plain read/write
+    use_range = hasattr(os, "copy_file_range")
+    use_splice = hasattr(os, "splice") #cross-filesystem copies on Linux
+    use_sendfile = hasattr(os, "sendfile")
+    pipe = None
+    offset = 0
+    try:
+        while True:
+            try:
+                if use_range:
+                    n = os.copy_file_range(sfd, dfd, 1 << 30)
+                elif use_splice:
+                    if pipe is None:
+                        pipe = open_pipe()
+                    n = splice_chunk(sfd, dfd, pipe)
+                elif use_sendfile:
+                    n = os.sendfile(dfd, sfd, offset, max(size - offset, 1 << 20))
+                else:
+                    n = os.write(dfd, os.read(sfd, 1 << 20))
+            except OSError as e:
+                #ENOTSOCK: macOS/BSD sendfile only writes to sockets
+                if e.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOTSOCK):
+                    raise
+                if use_range:
+                    use_range = False
+                elif use_splice:
+                    use_splice = False
+                elif use_sendfile:
+                    use_sendfile = False
+                else:
+                    raise
+                os.lseek(sfd, offset, os.SEEK_SET)
+                os.lseek(dfd, offset, os.SEEK_SET)
+                continue
+            if n == 0:
+                break
+            offset += n
+            report(pbar, n)
+    finally:
+        if pipe is not None:
+            os.close(pipe[0])
+            os.close(pipe[1])
+
+def tar_copy(srcs, sizes, src_root, dst_folder, pbar): #stream small files through one pax tar pipe into dst_folder, returns the number that failed
+    r, w = os.pipe()
+    times = {} #member name -> (atime_ns, mtime_ns), pax keeps mtimes as floats and loses the nanoseconds
+
+    def write():
+        try:
+            with os.fdopen(w, "wb") as pipe, tarfile.open(fileobj=pipe, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+                for s, size in zip(srcs, sizes):
+                    try:
+                        with open(s, "rb") as f:
+                            info = tar.gettarinfo(arcname=os.path.relpath(s, src_root), fileobj=f)
+                            st = os.fstat(f.fileno())
+                            times[info.name] = (st.st_atime_ns, st.st_mtime_ns) #before the member reaches the reader
+                            tar.addfile(info, f)
+                    except OSError as e:
+                        pbar.write(f"Error {s}: {e}")
+                    else:
+                        report(pbar, size)
+        except OSError as e: #the reading side gave up
+            pbar.write(f"Error writing tar stream: {e}")
+        finally:
+            flush(pbar)
+
+    writer = threading.Thread(target=write, daemon=True)
+    writer.start()
+    extracted = 0
+    try:
+        with os.fdopen(r, "rb") as pipe, tarfile.open(fileobj=pipe, mode="r|") as tar:
+            for member in tar:
+                d = os.path.join(dst_folder, member.name)
+                try:
+                    #no set_attrs: tarfile would chown to the source owner as root and round the mtime,
+                    #metadata is replicated the way copy_file_posix does it instead
+                    tar.extract(member, dst_folder, set_attrs=False, **EXTRACT_ARGS)
+                    os.utime(d, ns=times[member.name])
+                    os.chmod(d, stat.S_IMODE(member.mode))
+                except OSError as e:
+                    pbar.write(f"Error {d}: {e}")
+                else:
+                    extracted += 1
+    except (OSError, tarfile.TarError) as e: #broken stream, whatever wasn't extracted counts as failed
+        pbar.write(f"Error reading tar stream: {e}")
+    writer.join()
+    return len(srcs) - extracted
+
+def foldercopy(src, dst):
+    dst_folder = os.path.join(dst, os.path.basename(src)) #stores distribution folder path
+
+    #adding all source folder file paths and sizes into parallel lists, small files kept apart for the tar stream
+    srcs = []
+    dsts = []
+    sizes = []
+    small_srcs = []
+    small_sizes = []
+    for s, d, size, _ in iter_tree(src, dst_folder):
+        if size < SMALL_FILE:
+            small_srcs.append(s)
+            small_sizes.append(size)
+        else:
+            srcs.append(s)
+            dsts.append(d)
+            sizes.append(size)
+    totalsize = sum(sizes) + sum(small_sizes)
+
+    #creating every destination directory once, parents first, before dispatch
+    for p in sorted({os.path.dirname(d) for d in dsts}, key=len):
+        os.makedirs(p, exist_ok=True)
+
+    #passing the paths through copy_batch in groups while threading, at most 4 batches queued per worker
+    #failure counts are collected as each task finishes, no future outlives its task
+    failures = []
+    inflight = threading.BoundedSemaphore(4 * WORKERS)
+    with tqdm(total=totalsize, unit="B",unit_scale=True, mininterval=0.0) as pbar:
+
+        def collect(fut, count): #count: files the task covered, all failed if it raised
+            try:
+                failures.append(fut.result())
+            except Exception as e:
+                pbar.write(f"Error: {e}")
+                failures.append(count)
+
+        def batch_done(fut, count):
+            collect(fut, count)
+            inflight.release()
+
+        with ThreadPoolExecutor(max_workers=WORKERS) as thread:
+            if small_srcs:
+                thread.submit(tar_copy, small_srcs, small_sizes, src, dst_folder, pbar).add_done_callback(lambda f: collect(f, len(small_srcs)))
+            for i in range(0, len(srcs), BATCH_SIZE):
+                stop = min(i + BATCH_SIZE, len(srcs))
+                inflight.acquire()
+                thread.submit(copy_batch, srcs, dsts, sizes, i, stop, pbar).add_done_callback(lambda f, n=stop - i: batch_done(f, n))
+    failed = sum(failures)
+
+    if failed:
+        print(f"{failed} files failed to copy")
+
+if __name__ == "__main__":
+    src = input("Source folder: ").strip()
+    #dst = input("Destination folder: ").strip()
+    #src = "C:\AAAtest"
+    dst = "C:\BBBtest"
+
+    foldercopy(src, dst)
@@ -1,9 +1,25 @@
 from pydrive2.auth import GoogleAuth
-from pydrive2.drive import GoogleDrive
+from googleapiclient.discovery import build
+from googleapiclient.http import MediaFileUpload
 from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+import logging
+import logging.handlers
+import queue
+import threading
+import sys
 import os
 
-def get_drive():
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8 MB resumable chunks
+
+# workers only enqueue log records; a single listener thread does the printing
+log_queue = queue.SimpleQueue()
+log = logging.getLogger("gdrivetest")
+log.addHandler(logging.handlers.QueueHandler(log_queue))
+log.setLevel(logging.INFO)
+log.propagate = False
+
+def get_auth():
     gauth = GoogleAuth()
     gauth.LoadCredentialsFile("credentials.json")
     if gauth.credentials is None:
@@ -14,35 +30,52 @@ def get_drive():
         gauth.SaveCredentialsFile("credentials.json")
     else:
         gauth.Authorize()
-    return GoogleDrive(gauth)
+    return gauth
 
 def upload_folder_to_drive(folder_path, max_workers=4):
-    drive = get_drive()
-    folder_name = os.path.basename(folder_path)
-    folder_drive = drive.CreateFile({'title': folder_name, 'mimeType': 'application/vnd.google-apps.folder'})
-    folder_drive.Upload()
+    gauth = get_auth()
+    # one Drive v3 service; httplib2 connections aren't thread-safe, so each worker keeps its own authorized one
+    service = build('drive', 'v3', http=gauth.Get_Http_Object(), cache_discovery=False)
+    local = threading.local()
 
-    success = 0
-    failed = 0
+    folder_name = os.path.basename(folder_path)
+    folder_drive = service.files().create(
+        body={'name': folder_name, 'mimeType': 'application/vnd.google-apps.folder'}, fields='id'
+    ).execute()
 
     def upload_file(local_path):
-        nonlocal success, failed
         try:
-            file_drive = drive.CreateFile({'title': os.path.basename(local_path), 'parents': [{'id': folder_drive['id']}]})
-            file_drive.SetContentFile(local_path)
-            file_drive.Upload()
-            print(f"✅ Uploaded: {os.path.basename(local_path)}")
-            success += 1
+            http = getattr(local, 'http', None)
+            if http is None:
+                http = local.http = gauth.Get_Http_Object()
+            media = MediaFileUpload(local_path, resumable=True, chunksize=UPLOAD_CHUNK_SIZE)
+            request = service.files().create(
+                body={'name': os.path.basename(local_path), 'parents': [folder_drive['id']]},
+                media_body=media,
+                fields='id',
+            )
+            response = None
+            while response is None:
+                _, response = request.next_chunk(http=http)
+            log.info(f"✅ Uploaded: {os.path.basename(local_path)}")
+            return "ok"
         except Exception as e:
-            print(f"❌ Failed: {os.path.basename(local_path)} | {e}")
-            failed += 1
+            log.error(f"❌ Failed: {os.path.basename(local_path)} | {e}")
+            return "failed"
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for root, _, files in os.walk(folder_path):
-            for f in files:
-                executor.submit(upload_file, os.path.join(root, f))
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    listener.start()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            for root, _, files in os.walk(folder_path):
+                for f in files:
+                    futures.append(executor.submit(upload_file, os.path.join(root, f)))
+        counts = Counter(fut.result() for fut in futures)
+    finally:
+        listener.stop()
 
-    print(f"\n✅ Upload complete: {success} files succeeded, ❌ {failed} failed.")
+    print(f"\n✅ Upload complete: {counts['ok']} files succeeded, ❌ {counts['failed']} failed.")
     print(f"📂 Folder link: https://drive.google.com/drive/folders/{folder_drive['id']}")
 
 # Example:
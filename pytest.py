@@ -1,83 +1,200 @@
 import os
+import sys
+import errno
 import shutil
-import hashlib
-from concurrent.futures import ThreadPoolExecutor
+import mmap
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from tqdm import tqdm
+from threading import Lock, local
 
-def file_hash(path, block_size=65536): #Return MD5 hash of a file (used to detect changes).
-    md5 = hashlib.md5()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(block_size), b""):
-            md5.update(chunk)
-    return md5.hexdigest()
+MMAP_THRESHOLD = 16 * 1024 * 1024  # 16 MB, larger sources are copied from a mapping when the kernel can't
+COLD_COPY_THRESHOLD = 64 * 1024 * 1024  # 64 MB, larger files are dropped from the page cache after copying
+MTIME_WINDOW_NS = 2 * 10**9  # 2 s, FAT's mtime granularity; exFAT/NTFS/SMB round within it
 
-def needs_update(src, dst): #Check if dst needs to be updated from src.
-    if not os.path.exists(dst):
+copy_buffers = local() #one reusable read buffer per worker thread
+
+def files_differ(src, dst, block_size=1024*1024): #Compare two files in lockstep blocks, stopping at the first difference.
+    with open(src, "rb") as fsrc, open(dst, "rb") as fdst:
+        while True:
+            a = fsrc.read(block_size)
+            b = fdst.read(block_size)
+            if a != b:
+                return True
+            if not a:
+                return False
+
+def compare_or_differ(src, dst): #stage 1 worker, an unreadable or vanished pair counts as different so stage 2 copies or reports it
+    try:
+        return files_differ(src, dst)
+    except OSError:
         return True
-    if os.path.getsize(src) != os.path.getsize(dst):
+
+def iter_tree(src, dst_root): #recursive scandir, yields (src_path, dst_path, size, mtime_ns) for every file
+    try:
+        it = os.scandir(src)
+    except OSError as e: #unreadable folder, skipped like os.walk did
+        print(f"Skipped folder {src}: {e}")
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_tree(entry.path, os.path.join(dst_root, entry.name))
+            elif entry.is_file():
+                try:
+                    st = entry.stat()
+                except OSError as e: #vanished or unreadable since the listing
+                    print(f"Skipped {entry.path}: {e}")
+                    continue
+                yield entry.path, os.path.join(dst_root, entry.name), st.st_size, st.st_mtime_ns
+
+def needs_update(src, dst, src_size, src_mtime_ns, checksum=False, differs=None, dst_st=None): #Check if dst needs to be updated from src (already stat'ed by the caller), comparing content only when checksum is set (differs: precomputed {src: bool}, dst_st: dst's stat if the caller has it).
+    if dst_st is None:
+        try:
+            dst_st = os.stat(dst)
+        except OSError: #missing or unreadable, the copy attempt reports the actual problem
+            return True
+    if src_size != dst_st.st_size:
         return True
-    if int(os.path.getmtime(src)) > int(os.path.getmtime(dst)):
+    if src_mtime_ns - dst_st.st_mtime_ns > MTIME_WINDOW_NS: #coarse destination clocks don't count as newer
         return True
-    return file_hash(src) != file_hash(dst)
-
-def copy_file_with_progress(src, dst, position, chunk_size=1024*1024): #Copy file with aprogress bar
+    if not checksum:
+        return False
+    if differs is not None:
+        return differs[src]
+    return files_differ(src, dst)
+
+def kernel_copy(in_fd, out_fd, total_size, pbar, lock, step=1<<22): #In-kernel copy, returns bytes copied before it had to give up
+    sent = 0
+    use_range = hasattr(os, "copy_file_range") #same-FS reflink/offload on XFS/Btrfs
+    use_sendfile = hasattr(os, "sendfile")
+    while sent < total_size and (use_range or use_sendfile):
+        count = min(step, total_size - sent)
+        try:
+            if use_range:
+                n = os.copy_file_range(in_fd, out_fd, count, sent)
+            else:
+                n = os.sendfile(out_fd, in_fd, sent, count)
+        except OSError as e:
+            if e.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOTSOCK):
+                raise
+            if use_range:
+                use_range = False
+            else:
+                use_sendfile = False
+            continue
+        if n == 0:
+            break
+        sent += n
+        with lock:
+            pbar.update(n)
+    return sent
+
+def advise(fd, advice): #posix_fadvise over the whole file, where the platform has it
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+
+def mmap_copy(in_fd, out_fd, offset, total_size, pbar, lock, step=4<<20): #Write slices of a read-only mapping of the source, returns bytes copied
+    pos = offset
+    with mmap.mmap(in_fd, total_size, access=mmap.ACCESS_READ) as mm, memoryview(mm) as mv:
+        if hasattr(mm, "madvise"): #let the kernel read ahead aggressively
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+            mm.madvise(mmap.MADV_WILLNEED)
+        os.lseek(out_fd, offset, os.SEEK_SET)
+        while pos < total_size:
+            n = os.write(out_fd, mv[pos:pos + step])
+            pos += n
+            with lock:
+                pbar.update(n)
+    return pos - offset
+
+def copy_file_with_progress(src, dst, total_size, pbar, lock, chunk_size=1024*1024): #Copy file, advancing the shared progress bar (dst directory must exist)
     try:
-        os.makedirs(os.path.dirname(dst), exist_ok=True)
-        total_size = os.path.getsize(src)
-
-        with open(src, "rb") as fsrc, open(dst, "wb") as fdst, tqdm(
-            total=total_size,
-            unit="B",
-            unit_scale=True,
-            desc=os.path.basename(src),
-            position=position,
-            leave=False,
-        ) as pbar:
-            while True:
-                chunk = fsrc.read(chunk_size)
-                if not chunk:
-                    break
-                fdst.write(chunk)
-                pbar.update(len(chunk))
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            if total_size >= COLD_COPY_THRESHOLD:
+                advise(fsrc.fileno(), "POSIX_FADV_SEQUENTIAL")
+            sent = kernel_copy(fsrc.fileno(), fdst.fileno(), total_size, pbar, lock)
+            if total_size - sent > MMAP_THRESHOLD:
+                sent += mmap_copy(fsrc.fileno(), fdst.fileno(), sent, total_size, pbar, lock)
+            #userspace loop picks up whatever the kernel didn't copy (non-Linux, special files)
+            fsrc.seek(sent)
+            fdst.seek(sent)
+            buf = getattr(copy_buffers, "buf", None)
+            if buf is None or len(buf) != chunk_size:
+                buf = copy_buffers.buf = bytearray(chunk_size)
+            with memoryview(buf) as mv:
+                while True:
+                    n = fsrc.readinto(buf)
+                    if not n:
+                        break
+                    fdst.write(mv[:n])
+                    with lock:
+                        pbar.update(n)
+            if total_size >= COLD_COPY_THRESHOLD:
+                fdst.flush()
+                advise(fsrc.fileno(), "POSIX_FADV_DONTNEED")
+                advise(fdst.fileno(), "POSIX_FADV_DONTNEED") #starts writeback, drops what's already clean
 
         shutil.copystat(src, dst)  # preserve metadata
         return ("updated", f"Updated: {os.path.basename(src)}")
     except Exception as e:
         return ("error", f"Error {src}: {e}")
 
-def process_file(src, dst, position): #Process one file with progress bar.
-    if needs_update(src, dst):
-        return copy_file_with_progress(src, dst, position)
+def process_file(src, dst, size, mtime_ns, pbar, lock, checksum=False, differs=None, dst_st=None): #Process one file, skipped files still count towards the progress bar.
+    if needs_update(src, dst, size, mtime_ns, checksum, differs, dst_st):
+        return copy_file_with_progress(src, dst, size, pbar, lock)
     else:
+        with lock:
+            pbar.update(size)
         return ("skipped", f"Skipped: {os.path.basename(src)}")
 
-def sync_file(src_file, dst_folder): #Sync a single file directly into destination root.
+def sync_file(src_file, dst_folder, checksum=False): #Sync a single file directly into destination root.
     dst_file = os.path.join(dst_folder, os.path.basename(src_file))
-    result, msg = process_file(src_file, dst_file, 0)
+    os.makedirs(dst_folder, exist_ok=True)
+    st = os.stat(src_file)
+    with tqdm(total=st.st_size, unit="B", unit_scale=True, desc=os.path.basename(src_file)) as pbar:
+        result, msg = process_file(src_file, dst_file, st.st_size, st.st_mtime_ns, pbar, Lock(), checksum)
     print(f"\n--- Sync Summary for {src_file} ---")
     print(msg)
 
-def sync_folder(src_folder, dst_folder, workers=4): #Sync a folder with parallel byte-level progress bars.
+def sync_folder(src_folder, dst_folder, workers=4, checksum=False): #Sync a folder with parallel byte-level progress bars.
     dst_folder = os.path.join(dst_folder, os.path.basename(src_folder))
     os.makedirs(dst_folder, exist_ok=True)
 
     tasks = []
-    for root, _, files in os.walk(src_folder):
-        rel_path = os.path.relpath(root, src_folder)
-        dst_root = os.path.join(dst_folder, rel_path)
-        for f in files:
-            src_file = os.path.join(root, f)
-            dst_file = os.path.join(dst_root, f)
-            tasks.append((src_file, dst_file))
-
+    totalsize = 0
+    for task in iter_tree(src_folder, dst_folder):
+        tasks.append(task)
+        totalsize += task[2]
+
+    for p in sorted({os.path.dirname(d) for _, d, _, _ in tasks}, key=len): #parents first, once per directory
+        os.makedirs(p, exist_ok=True)
+
+    # stage 1: compare the pairs that size/mtime can't decide on, one process per core
+    differs = None
+    dst_stats = {} #stat'ed once here, reused by stage 2
+    if checksum:
+        for s, d, _, _ in tasks:
+            try:
+                dst_stats[s] = os.stat(d)
+            except OSError:
+                pass #missing or unreadable, stage 2 copies or reports it
+        pairs = [(s, d) for s, d, size, mtime_ns in tasks if s in dst_stats and not needs_update(s, d, size, mtime_ns, dst_st=dst_stats[s])]
+        srcs = [s for s, _ in pairs]
+        dsts = [d for _, d in pairs]
+        with ProcessPoolExecutor() as pp:
+            differs = dict(zip(srcs, pp.map(compare_or_differ, srcs, dsts, chunksize=8)))
+
+    # stage 2: copy on threads (I/O-bound)
     results = []
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = {
-            executor.submit(process_file, s, d, i): (s, d)
-            for i, (s, d) in enumerate(tasks)
-        }
-        for f in ThreadPoolExecutor(futures):
-            results.append(f.result())
+    lock = Lock()
+    with tqdm(total=totalsize, unit="B", unit_scale=True, desc=os.path.basename(src_folder)) as pbar:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(process_file, s, d, size, mtime_ns, pbar, lock, checksum, differs, dst_stats.get(s)): (s, d)
+                for s, d, size, mtime_ns in tasks
+            }
+            for fut in as_completed(futures):
+                results.append(fut.result())
 
     # Count stats
     updated = sum(1 for r in results if r[0] == "updated")
@@ -87,16 +204,17 @@ def sync_folder(src_folder, dst_folder, workers=4): #Sync a folder with parallel
     print(f"\n--- Sync Summary for {src_folder} ---")
     print(f"{updated} updated, {skipped} skipped, {errors} errors")
 
-def sync_multiple(src_paths, dst_folder, workers=4): #Sync multiple files/folders with parallel progress bars
+def sync_multiple(src_paths, dst_folder, workers=4, checksum=False): #Sync multiple files/folders with parallel progress bars
     for src in src_paths:
         if os.path.isfile(src):
-            sync_file(src, dst_folder)  # ✅ goes to HDD root
+            sync_file(src, dst_folder, checksum=checksum)  # ✅ goes to HDD root
         elif os.path.isdir(src):
-            sync_folder(src, dst_folder, workers=workers)  # ✅ keeps folder
+            sync_folder(src, dst_folder, workers=workers, checksum=checksum)  # ✅ keeps folder
         else:
             print(f"⚠️ Skipped invalid path: {src}")
 
 if __name__ == "__main__":
+    checksum = "--checksum" in sys.argv[1:] #compare contents of unchanged-looking files too
     print("Enter the source files or folders you want to sync.")
     print("Enter one per line, and press Enter on an empty line when done.\n")
 
@@ -118,4 +236,4 @@ if __name__ == "__main__":
     if not os.path.exists(dst):
         os.makedirs(dst, exist_ok=True)
 
-    sync_multiple(src_paths, dst, workers=4)
+    sync_multiple(src_paths, dst, workers=4, checksum=checksum)
@@ -0,0 +1,69 @@
+#run with: python -m unittest test_uipytest (pytest.py in this folder shadows the pytest package)
+import os, errno, queue, shutil, tempfile, threading, unittest
+from pathlib import Path
+from threading import Lock
+from unittest import mock
+
+import uipytest
+
+def bsd_sendfile(out_fd, in_fd, offset, count): #macOS/BSD: int offset required, regular-file destinations refused
+    if not isinstance(offset, int):
+        raise TypeError("an integer is required")
+    raise OSError(errno.ENOTSOCK, os.strerror(errno.ENOTSOCK))
+
+def no_copy_file_range(*args):
+    raise OSError(errno.ENOSYS, os.strerror(errno.ENOSYS))
+
+class SendfileFallback(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmp, "src.bin")
+        self.dst = os.path.join(self.tmp, "dst.bin")
+        self.data = os.urandom(3 * uipytest.CHUNK_SIZE + 123)
+        with open(self.src, "wb") as f:
+            f.write(self.data)
+        #force the sendfile branch: copy_file_range unsupported, sendfile behaves like macOS
+        patches = [mock.patch.object(os, "copy_file_range", no_copy_file_range, create=True),
+                   mock.patch.object(os, "sendfile", bsd_sendfile, create=True)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def test_kernel_copy_gives_up_on_enotsock(self):
+        with open(self.src, "rb") as fsrc, open(self.dst, "wb") as fdst:
+            sent = uipytest.kernel_copy(fsrc.fileno(), fdst.fileno(), len(self.data), lambda n: None, threading.Event())
+        self.assertEqual(sent, 0)
+
+    def test_copy_falls_back_to_read_loop(self):
+        t = uipytest.transfer(self.src, self.tmp, queue.Queue(), threading.Event(), 2)
+        status, _ = t.copy_file_with_progress(Path(self.src), Path(self.dst), len(self.data), [0, -1], Lock())
+        self.assertEqual(status, "updated")
+        with open(self.dst, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+class MtimeWindow(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.src = os.path.join(self.tmp, "src")
+        self.dst = os.path.join(self.tmp, "dst")
+        for p in (self.src, self.dst):
+            with open(p, "wb") as f:
+                f.write(b"same size")
+        self.mtime = 1_700_000_001_234_567_891
+        os.utime(self.src, ns=(self.mtime, self.mtime))
+
+    def dst_mtime(self, ns):
+        os.utime(self.dst, ns=(ns, ns))
+
+    def test_rounded_destination_is_up_to_date(self): #FAT keeps even seconds
+        self.dst_mtime(self.mtime - self.mtime % (2 * 10**9))
+        self.assertFalse(uipytest.transfer.needs_update(self.src, self.dst))
+
+    def test_clearly_older_destination_is_updated(self):
+        self.dst_mtime(self.mtime - 3 * 10**9)
+        self.assertTrue(uipytest.transfer.needs_update(self.src, self.dst))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,20 @@
 import os
+import sys
+import errno
+import ctypes
+import ctypes.util
+import functools
+import contextlib
+import time
 import queue
+import collections
+import unicodedata
+import mimetypes
+from array import array
 import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from threading import Lock
 from pathlib import Path
 import hashlib
@@ -11,17 +22,204 @@ import shutil
 from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive
 
-CHUNK_SIZE = 1024 * 1024  # 1 MB
+try:
+    import blake3  # SIMD BLAKE3, optional
+except ImportError:
+    blake3 = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CHUNK_SIZE = 4 * 1024 * 1024  # 4 MB
 LARGE_FILE_THRESHOLD = 10 * 1024 * 1024  # 10 MB
+HASH_BLOCK_SIZE = 4 * 1024 * 1024  # 4 MB
+HASH_READERS = 4
+PROGRESS_INTERVAL = 1 / 30  # seconds, progress events per worker are capped at ~30 Hz
+KERNEL_COPY_STEP = 8 * 1024 * 1024  # 8 MB per copy_file_range call, keeps progress and cancel responsive
+FICLONE = 0x40049409  # linux/fs.h, reflink the whole file on Btrfs/XFS
+READAHEAD_THRESHOLD = 64 * 1024 * 1024  # 64 MB, larger files are read with several preads in flight
+READAHEAD_DEPTH = 8  # CHUNK_SIZE reads kept in flight
+# statx(2): only ask for what needs_update reads, and don't make network filesystems revalidate
+AT_FDCWD = -100
+AT_STATX_DONT_SYNC = 0x4000
+STATX_TYPE = 0x1
+STATX_MTIME = 0x40
+STATX_SIZE = 0x200
 WORKERS = min(8, max(2, os.cpu_count() or 4))
 
+# Drive only reports MD5; OpenSSL's md5 already picks its assembly per CPU at runtime,
+# usedforsecurity=False keeps it constructible on FIPS-mode OpenSSL builds
+_md5 = functools.partial(hashlib.md5, usedforsecurity=False)
+
+def _executor(pool, workers):
+    # the tab's long-lived pool when there is one, else a pool of `workers` threads for this run only
+    if pool is not None:
+        return contextlib.nullcontext(pool)
+    return ThreadPoolExecutor(max_workers=workers)
 
-def get_file_hash(path, block_size=65536):
-    md5 = hashlib.md5()
-    with open(path, "rb") as f:
+
+def _content_hash(path, block_size=HASH_BLOCK_SIZE):
+    # local-vs-local comparison only, no need for MD5
+    # unbuffered, the io layer's 8 KB buffer would only add a copy in front of the large reads
+    with open(path, "rb", buffering=0) as f:
+        if blake3 is None and hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "blake2b").hexdigest()
+        hasher = blake3.blake3() if blake3 is not None else hashlib.blake2b()
         for chunk in iter(lambda: f.read(block_size), b""):
-            md5.update(chunk)
-    return md5.hexdigest()
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _fast_copy(fsrc, fdst, size, advance, stop_event):
+    # kernel-side copy, returns bytes copied and leaves both files positioned there for the read/write loop
+    if fcntl is not None and sys.platform.startswith("linux"):
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            fsrc.seek(size)
+            fdst.seek(size)
+            advance(size)
+            return size
+        except OSError:
+            pass
+    sent = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while sent < size and not stop_event.is_set():
+                n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), min(KERNEL_COPY_STEP, size - sent))
+                if n == 0:
+                    break
+                sent += n
+                advance(n)
+        except OSError as e:
+            # destination FS can't take it, the read/write loop stays the baseline
+            if e.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP):
+                raise
+        fsrc.seek(sent)
+        fdst.seek(sent)
+    return sent
+
+def _pread_chunks(fd, offset, size, stop_event):
+    # keeps READAHEAD_DEPTH preads in flight so the drive queue isn't stuck at depth 1, yields the chunks in order
+    # stops early on a short read, the caller's sequential loop finishes from there
+    with ThreadPoolExecutor(max_workers=READAHEAD_DEPTH, thread_name_prefix='readahead') as readers:
+        pending = collections.deque()
+        pos = offset
+        while pending or pos < size:
+            while pos < size and len(pending) < READAHEAD_DEPTH and not stop_event.is_set():
+                want = min(CHUNK_SIZE, size - pos)
+                pending.append((want, readers.submit(os.pread, fd, want, pos)))
+                pos += want
+            if not pending:
+                return
+            want, fut = pending.popleft()
+            chunk = fut.result()
+            if chunk:
+                yield chunk
+            if len(chunk) < want or stop_event.is_set():
+                for _, fut in pending:
+                    fut.cancel()
+                return
+
+class _HashingStream:
+    # file wrapper that MD5s the bytes as the uploader reads them, so checking the upload against Drive costs no second read
+    def __init__(self, f, hasher):
+        self.f = f
+        self.hasher = hasher
+        self.hashed = 0  # resumable retries seek back and re-read, only bytes past this get hashed
+
+    def read(self, n=-1):
+        pos = self.f.tell()
+        data = self.f.read(n)
+        end = pos + len(data)
+        if pos <= self.hashed < end:
+            self.hasher.update(memoryview(data)[self.hashed - pos:])
+            self.hashed = end
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self.f.seek(offset, whence)
+
+    def tell(self):
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+    def hexdigest(self, size):
+        # None if the uploader skipped any part of the file
+        return self.hasher.hexdigest() if self.hashed == size else None
+
+def _drive_key(name):
+    # Drive titles can differ from the local name by trailing whitespace, case or Unicode normalisation
+    return unicodedata.normalize("NFC", name.strip()).casefold()
+
+class _StatxTimestamp(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_int64), ("tv_nsec", ctypes.c_uint32), ("reserved", ctypes.c_int32)]
+
+class _Statx(ctypes.Structure):
+    _fields_ = [
+        ("stx_mask", ctypes.c_uint32), ("stx_blksize", ctypes.c_uint32), ("stx_attributes", ctypes.c_uint64),
+        ("stx_nlink", ctypes.c_uint32), ("stx_uid", ctypes.c_uint32), ("stx_gid", ctypes.c_uint32),
+        ("stx_mode", ctypes.c_uint16), ("spare0", ctypes.c_uint16),
+        ("stx_ino", ctypes.c_uint64), ("stx_size", ctypes.c_uint64), ("stx_blocks", ctypes.c_uint64),
+        ("stx_attributes_mask", ctypes.c_uint64),
+        ("stx_atime", _StatxTimestamp), ("stx_btime", _StatxTimestamp),
+        ("stx_ctime", _StatxTimestamp), ("stx_mtime", _StatxTimestamp),
+        ("spare", ctypes.c_uint8 * 128),  # rdev/dev and reserved space, 256 bytes in total like struct statx
+    ]
+
+_FastStat = collections.namedtuple("_FastStat", "st_size st_mtime st_mtime_ns")
+
+@functools.lru_cache(maxsize=1)
+def _statx_func():
+    # glibc >= 2.28 wraps statx, detected once
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        func = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True).statx
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.POINTER(_Statx)]
+    func.restype = ctypes.c_int
+    return func
+
+def _fast_stat(path):
+    # size + mtime via a narrow statx where available, os.stat otherwise
+    statx = _statx_func()
+    if statx is None:
+        return os.stat(path)
+    buf = _Statx()
+    if statx(AT_FDCWD, os.fsencode(path), AT_STATX_DONT_SYNC, STATX_TYPE | STATX_SIZE | STATX_MTIME, ctypes.byref(buf)) != 0:
+        err = ctypes.get_errno()
+        if err == errno.ENOSYS:  # kernel older than 4.11
+            return os.stat(path)
+        raise OSError(err, os.strerror(err), str(path))
+    mtime_ns = buf.stx_mtime.tv_sec * 1_000_000_000 + buf.stx_mtime.tv_nsec
+    return _FastStat(buf.stx_size, mtime_ns / 1e9, mtime_ns)
+
+def _dir_entries(path):
+    # one scandir per destination directory, its DirEntries carry the stat data FindNextFileW already returned on Windows
+    try:
+        with os.scandir(path) as it:
+            return {entry.name: entry for entry in it}
+    except OSError:
+        return {}
+
+def _iter_tree(root, rel=""):
+    # recursive scandir, yields (DirEntry, rel_dir) for every file; entries carry the stat data the OS already returned
+    try:
+        it = os.scandir(root)
+    except OSError as e:
+        # unreadable folder, skipped like os.walk did
+        print(f"Warning: Skipped folder {root} ({e})")
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_tree(entry.path, os.path.join(rel, entry.name))
+            elif entry.is_file():
+                yield entry, rel
 
 def get_drive():
     client_secrets_file = '/home/gostlimoss62/Documents/1A_projects/file_transfer/client_secrets.json'
@@ -56,8 +254,44 @@ def get_drive():
     gauth.SaveCredentialsFile(credentials_file)
     return GoogleDrive(gauth)
 
+class AtomicInt:
+    # running byte total shared by the copy workers, the lock only covers the add
+    def __init__(self, value=0):
+        self._value = value
+        self._lock = Lock()
+
+    def add(self, n):
+        with self._lock:
+            self._value += n
+            return self._value
+
+    @property
+    def value(self):
+        return self._value
+
+class _ProgressThrottle:
+    # shared by all workers of a transfer: an event goes out when the overall percent moves up,
+    # otherwise at most once per PROGRESS_INTERVAL for the whole transfer
+    def __init__(self, progress_queue, tab_id):
+        self.progress_queue = progress_queue
+        self.tab_id = tab_id
+        self._lock = Lock()
+        self._pct = -1
+        self._time = 0.0
+
+    def report(self, pct, name):
+        with self._lock:
+            now = time.monotonic()
+            if pct <= self._pct and now - self._time < PROGRESS_INTERVAL:
+                return
+            # a worker that lost the race to the counter must not move the bar backwards
+            pct = self._pct = max(pct, self._pct)
+            self._time = now
+        # progress_queue.put is already thread-safe
+        self.progress_queue.put({"phase": "downloading", "percent": pct, "name": name, "tab_id": self.tab_id})
+
 class LocalTransfer(threading.Thread):
-    def __init__(self, src, dst, progress_queue, stop_event, workers, tab_id):
+    def __init__(self, src, dst, progress_queue, stop_event, workers, tab_id, verify_hash=False, pool=None):
         super().__init__(daemon=True)
         self.src = Path(src).resolve()
         self.dst = Path(dst).resolve()
@@ -65,44 +299,64 @@ class LocalTransfer(threading.Thread):
         self.stop_event = stop_event
         self.workers = workers
         self.tab_id = tab_id
+        self.verify_hash = verify_hash
+        self.pool = pool  # the tab's executor, reused across runs
+        self._progress = _ProgressThrottle(progress_queue, tab_id)
+
+    def _report(self, done, totalsize, name):
+        self._progress.report(int(done / totalsize * 100) if totalsize else 100, name)
 
     @staticmethod
-    def needs_update(src_path: Path, dst_path: Path) -> bool:
-        if not dst_path.exists():
-            return True
+    def needs_update(src_path: Path, dst_path: Path, verify_hash: bool = False, src_st=None, dst_st=None) -> bool:
+        # size + mtime decide, like rsync; content is only hashed when verify_hash is set (paranoid mode)
+        # src_st/dst_st: stat results the caller already has, stat'ed here otherwise
         try:
-            if src_path.stat().st_size != dst_path.stat().st_size:
-                return True
-            if int(src_path.stat().st_mtime) > int(dst_path.stat().st_mtime):
-                return True
+            if src_st is None:
+                src_st = _fast_stat(src_path)
+            if dst_st is None:
+                dst_st = _fast_stat(dst_path)
         except Exception:
             return True
+        if src_st.st_size != dst_st.st_size:
+            return True
+        if abs(src_st.st_mtime - dst_st.st_mtime) >= 1.0:
+            return True
+        if not verify_hash:
+            return False
         try:
-            return get_file_hash(src_path) != get_file_hash(dst_path)
+            return _content_hash(src_path) != _content_hash(dst_path)
         except Exception:
             return True
 
-    def copy_file_with_progress(self, src_file: Path, dst_file: Path, totalsize: int, current_size: list, lock: Lock):
+    def copy_file_with_progress(self, src_file: Path, dst_file: Path, totalsize: int, copied: AtomicInt, src_st=None):
         if self.stop_event.is_set():
             return ("cancelled", f"Cancelled: {src_file}")
         try:
             dst_file.parent.mkdir(parents=True, exist_ok=True)
-            file_size = src_file.stat().st_size
+            file_size = (src_st if src_st is not None else src_file.stat()).st_size
             if file_size >= LARGE_FILE_THRESHOLD:
+                def advance(n):
+                    self._report(copied.add(n), totalsize, src_file.name)
+
                 with src_file.open("rb") as fsrc, dst_file.open("wb") as fdst:
-                    while True:
-                        if self.stop_event.is_set():
-                            return ("cancelled", f"Cancelled: {src_file}")
-                        chunk = fsrc.read(CHUNK_SIZE)
-                        if not chunk:
-                            break
-                        fdst.write(chunk)
-                        with lock:
-                            current_size[0] += len(chunk)
-                            pct = int(current_size[0] / totalsize * 100)
-                            self.progress_queue.put({
-                                "phase": "downloading", "percent": pct, "name": src_file.name, "tab_id": self.tab_id
-                            })
+                    sent = _fast_copy(fsrc, fdst, file_size, advance, self.stop_event)
+                    if hasattr(os, "pread") and file_size - sent >= READAHEAD_THRESHOLD:
+                        # io_uring would need a non-stdlib binding, preads on helper threads get the same queue depth
+                        for chunk in _pread_chunks(fsrc.fileno(), sent, file_size, self.stop_event):
+                            fdst.write(chunk)
+                            sent += len(chunk)
+                            advance(len(chunk))
+                        fsrc.seek(sent)
+                    buf = bytearray(CHUNK_SIZE)  # one buffer per file, no per-chunk allocation
+                    with memoryview(buf) as view:
+                        while True:
+                            if self.stop_event.is_set():
+                                return ("cancelled", f"Cancelled: {src_file}")
+                            n = fsrc.readinto(buf)
+                            if not n:
+                                break
+                            fdst.write(view[:n])
+                            advance(n)
                 try:
                     shutil.copystat(src_file, dst_file)
                 except Exception:
@@ -110,28 +364,24 @@ class LocalTransfer(threading.Thread):
                 return ("updated", f"Updated: {src_file}")
             else:
                 shutil.copy2(src_file, dst_file)
-                with lock:
-                    current_size[0] += file_size
-                    pct = int(current_size[0] / totalsize * 100)
-                    self.progress_queue.put({
-                        "phase": "downloading", "percent": pct, "name": src_file.name, "tab_id": self.tab_id
-                    })
+                self._report(copied.add(file_size), totalsize, src_file.name)
                 return ("updated", f"Updated: {src_file}")
         except Exception as e:
             return ("error", f"Error copying {src_file}: {e}")
 
-    def process_file(self, src_file: Path, dst_file: Path, totalsize: int, current_size: list, lock: Lock):
+    def process_file(self, src_file: Path, dst_file: Path, totalsize: int, copied: AtomicInt, src_entry=None, dst_entry=None, size=0):
         if self.stop_event.is_set():
             return ("cancelled", f"Cancelled: {src_file}")
         try:
-            if LocalTransfer.needs_update(src_file, dst_file):
-                return self.copy_file_with_progress(src_file, dst_file, totalsize, current_size, lock)
+            src_file, dst_file = Path(src_file), Path(dst_file)  # sync_folder hands over plain strings
+            # one source stat per file, shared by the decision and the copy
+            src_st = src_entry.stat() if src_entry is not None else _fast_stat(src_file)
+            # DirEntry.stat() is free only on Windows, elsewhere needs_update's statx is the cheaper call
+            dst_st = dst_entry.stat() if dst_entry is not None else None
+            if LocalTransfer.needs_update(src_file, dst_file, self.verify_hash, src_st, dst_st):
+                return self.copy_file_with_progress(src_file, dst_file, totalsize, copied, src_st)
             else:
-                with lock:
-                    pct = int(current_size[0] / totalsize * 100) if totalsize else 100
-                    self.progress_queue.put({
-                        "phase": "downloading", "percent": pct, "name": f"(Skipped) {src_file.name}", "tab_id": self.tab_id
-                    })
+                self._report(copied.add(size), totalsize, f"(Skipped) {src_file.name}")
                 return ("skipped", f"Skipped: {src_file}")
         except Exception as e:
             return ("error", f"Error processing {src_file}: {e}")
@@ -139,26 +389,40 @@ class LocalTransfer(threading.Thread):
     def sync_folder(self):
         dst_root = self.dst.joinpath(self.src.name)
         dst_root.mkdir(parents=True, exist_ok=True)
-        tasks = []
+        # parallel lists instead of a list of Path tuples, Path objects are only built on the workers
+        src_paths = []
+        dst_paths = []
+        sizes = array('q')
+        src_entries = []
+        dst_entries = []
         totalsize = 0
-        for root, _, files in os.walk(self.src):
-            rel = os.path.relpath(root, self.src)
-            for f in files:
-                s = Path(root) / f
-                d = dst_root.joinpath(rel) / f
-                tasks.append((s, d))
-                try:
-                    totalsize += s.stat().st_size
-                except Exception:
-                    pass
-        if totalsize == 0 and tasks:
+        dst_root_str = str(dst_root)
+        # destination listings only pay off on Windows, elsewhere process_file stats the destination itself
+        list_dst = os.name == "nt"
+        dst_listings = {}
+        for entry, rel in _iter_tree(self.src):
+            if list_dst and rel not in dst_listings:
+                dst_listings[rel] = _dir_entries(os.path.join(dst_root_str, rel))
+            try:
+                size = entry.stat().st_size
+            except Exception:
+                size = 0
+            src_paths.append(entry.path)
+            dst_paths.append(os.path.join(dst_root_str, rel, entry.name))
+            sizes.append(size)
+            src_entries.append(entry)
+            dst_entries.append(dst_listings[rel].get(entry.name) if list_dst else None)
+            totalsize += size
+        if totalsize == 0 and src_paths:
             totalsize = 1
-        lock = Lock()
-        current_size = [0]
+        copied = AtomicInt()
         results = []
-        with ThreadPoolExecutor(max_workers=self.workers) as executor:
-            futures = [executor.submit(self.process_file, s, d, totalsize, current_size, lock) for s, d in tasks]
-            for fut in futures:
+        with _executor(self.pool, self.workers) as executor:
+            futures = [
+                executor.submit(self.process_file, src_paths[i], dst_paths[i], totalsize, copied, src_entries[i], dst_entries[i], sizes[i])
+                for i in range(len(src_paths))
+            ]
+            for fut in as_completed(futures):
                 try:
                     res = fut.result()
                 except Exception as e:
@@ -166,6 +430,11 @@ class LocalTransfer(threading.Thread):
                 results.append(res)
                 if self.stop_event.is_set():
                     break
+            if self.stop_event.is_set():
+                # the tab's pool outlives this transfer, so drop what's still queued and let running copies see the stop
+                for fut in futures:
+                    fut.cancel()
+                wait(futures)
         return results
 
     def sync_file(self):
@@ -174,9 +443,7 @@ class LocalTransfer(threading.Thread):
             totalsize = self.src.stat().st_size
         except Exception:
             totalsize = 1
-        lock = Lock()
-        current_size = [0]
-        res = self.process_file(self.src, dst_file, totalsize, current_size, lock)
+        res = self.process_file(self.src, dst_file, totalsize, AtomicInt())
         return [res]
 
     def run(self):
@@ -202,7 +469,7 @@ class LocalTransfer(threading.Thread):
             self.progress_queue.put({"phase": "error", "message": str(e), "tab_id": self.tab_id})
 
 class GDriveTransfer(threading.Thread):
-    def __init__(self, src, progress_queue, stop_event, workers, tab_id, gdrive_service):
+    def __init__(self, src, progress_queue, stop_event, workers, tab_id, gdrive_service, pool=None):
         super().__init__(daemon=True)
         self.src = Path(src).resolve()
         self.progress_queue = progress_queue
@@ -210,6 +477,7 @@ class GDriveTransfer(threading.Thread):
         self.workers = workers
         self.tab_id = tab_id
         self.gdrive_service = gdrive_service
+        self.pool = pool  # the tab's executor, reused across runs
         self.folder_link = ""
 
     def run(self):
@@ -236,21 +504,27 @@ class GDriveTransfer(threading.Thread):
             self.folder_link = f"https://drive.google.com/drive/folders/{gdrive_folder['id']}"
 
             self.progress_queue.put({"phase": "status", "message": "Checking for existing files...", "tab_id": self.tab_id})
-            remote_files = {}
             query = f"'{gdrive_folder['id']}' in parents and trashed=false"
-            file_list = self.gdrive_service.ListFile({'q': query}).GetList()
-            for file in file_list:
-                if 'md5Checksum' in file:
-                    remote_files[file['title']] = {
-                        'id': file['id'],
-                        'size': int(file['fileSize']),
-                        'md5': file['md5Checksum']
-                    }
+            # largest pages, and only the fields the dedup check reads
+            file_list = self.gdrive_service.ListFile({
+                'q': query,
+                'maxResults': 1000,
+                'fields': 'items(id,title,fileSize,md5Checksum),nextPageToken'
+            }).GetList()
+            remote_files = {
+                _drive_key(file['title']): {'id': file['id'], 'size': int(file['fileSize']), 'md5': file['md5Checksum']}
+                for file in file_list if 'md5Checksum' in file
+            }
 
             local_files_to_check = []
-            for root, _, files in os.walk(self.src):
-                for f in files:
-                    local_files_to_check.append(Path(root) / f)
+            local_sizes = {}
+            for entry, _ in _iter_tree(self.src):
+                local_path = Path(entry.path)
+                local_files_to_check.append(local_path)
+                try:
+                    local_sizes[local_path] = entry.stat().st_size
+                except OSError:
+                    pass  # left to the hashing stage, which reports the error
 
             total_files = len(local_files_to_check)
             if total_files == 0:
@@ -260,48 +534,73 @@ class GDriveTransfer(threading.Thread):
             uploaded_count = 0
             skipped_count = 0
             lock = Lock()
+            progress = _ProgressThrottle(self.progress_queue, self.tab_id)
 
-            def check_and_upload_file(local_path):
-                nonlocal uploaded_count, skipped_count
+            def upload_file(local_path):
+                nonlocal uploaded_count
                 if self.stop_event.is_set():
                     return
 
                 try:
                     file_name = local_path.name
-                    local_size = local_path.stat().st_size
-                    local_md5 = get_file_hash(local_path)
-
-                    if file_name in remote_files:
-                        remote_file_info = remote_files[file_name]
-                        if local_size == remote_file_info['size'] and local_md5 == remote_file_info['md5']:
-                            with lock:
-                                skipped_count += 1
-                                pct = int(((uploaded_count + skipped_count) / total_files) * 100)
-                                self.progress_queue.put({
-                                    "phase": "downloading", "percent": pct, "name": f"(Skipped) {file_name}", "tab_id": self.tab_id
-                                })
-                            return
-
                     gfile = self.gdrive_service.CreateFile({
                         'title': file_name,
                         'parents': [{'id': gdrive_folder['id']}]
                     })
-                    gfile.SetContentFile(str(local_path))
-                    gfile.Upload()
+                    size = local_sizes.get(local_path, 0)
+                    if size >= LARGE_FILE_THRESHOLD:
+                        # hash what goes over the wire and check it against Drive's md5Checksum in the same read
+                        gfile['mimeType'] = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+                        stream = _HashingStream(open(local_path, "rb"), _md5())
+                        try:
+                            gfile.content = stream
+                            gfile.Upload()
+                        finally:
+                            stream.close()
+                        sent_md5 = stream.hexdigest(size)
+                        if sent_md5 and gfile.get('md5Checksum') and sent_md5 != gfile['md5Checksum']:
+                            raise IOError("checksum mismatch after upload, file changed while uploading?")
+                    else:
+                        gfile.SetContentFile(str(local_path))
+                        gfile.Upload()
 
                     with lock:
                         uploaded_count += 1
                         pct = int(((uploaded_count + skipped_count) / total_files) * 100)
-                        self.progress_queue.put({
-                            "phase": "downloading", "percent": pct, "name": file_name, "tab_id": self.tab_id
-                        })
+                    progress.report(pct, file_name)
                 except Exception as e:
                     self.progress_queue.put({"phase": "error", "message": f"Failed to process {local_path.name}: {e}", "tab_id": self.tab_id})
 
-            with ThreadPoolExecutor(max_workers=self.workers) as executor:
-                futures = [executor.submit(check_and_upload_file, path) for path in local_files_to_check]
-                for future in futures:
+            with _executor(self.pool, self.workers) as executor:
+                futures = []
+                # a size mismatch already means upload, only same-size files are worth reading for their MD5
+                to_hash = []
+                for local_path in local_files_to_check:
+                    remote_file_info = remote_files.get(_drive_key(local_path.name))
+                    if remote_file_info is None or local_sizes.get(local_path, remote_file_info['size']) != remote_file_info['size']:
+                        futures.append(executor.submit(upload_file, local_path))
+                    else:
+                        to_hash.append(local_path)
+                # hashing runs ahead on the pipeline; only files whose MD5 differs from Drive get uploaded
+                for local_path, local_size, local_md5, error in _HashPipeline(to_hash, self.stop_event):
+                    if error is not None:
+                        self.progress_queue.put({"phase": "error", "message": f"Failed to process {local_path.name}: {error}", "tab_id": self.tab_id})
+                        continue
+                    remote_file_info = remote_files[_drive_key(local_path.name)]
+                    if local_size == remote_file_info['size'] and local_md5 == remote_file_info['md5']:
+                        with lock:
+                            skipped_count += 1
+                            pct = int(((uploaded_count + skipped_count) / total_files) * 100)
+                        progress.report(pct, f"(Skipped) {local_path.name}")
+                        continue
+                    futures.append(executor.submit(upload_file, local_path))
+                for future in as_completed(futures):
                     future.result()
+                    if self.stop_event.is_set():
+                        for rest in futures:
+                            rest.cancel()
+                        wait(futures)
+                        break
 
             if self.stop_event.is_set():
                 self.progress_queue.put({"phase": "cancelled", "tab_id": self.tab_id})
@@ -313,8 +612,106 @@ class GDriveTransfer(threading.Thread):
             self.progress_queue.put({"phase": "error", "message": f"An error occurred: {e}", "tab_id": self.tab_id})
 
 
+class _HashPipeline:
+    # Drive reports md5Checksum, so uploads must compare with MD5
+    # reader threads MD5 local files while the upload workers keep the network busy
+    # (recycled buffers back the hashing loop on Pythons without hashlib.file_digest)
+    def __init__(self, paths, stop_event, readers=HASH_READERS):
+        self.paths = queue.Queue()
+        for path in paths:
+            self.paths.put(path)
+        self.buffers = queue.Queue()
+        if not hasattr(hashlib, "file_digest"):
+            for _ in range(readers):
+                self.buffers.put(bytearray(HASH_BLOCK_SIZE))
+        self.results = queue.Queue(maxsize=readers * 4)
+        self.stop_event = stop_event
+        self.closed = threading.Event()  # the consumer stopped iterating, nobody will drain results any more
+        self.readers = [threading.Thread(target=self._read, daemon=True) for _ in range(readers)]
+
+    def _md5(self, path):
+        with open(path, "rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            if hasattr(os, "posix_fadvise"):
+                # each reader asks for a wider readahead window, so its disk reads overlap the hashing of the previous block
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            if hasattr(hashlib, "file_digest"):
+                # 3.11+: readinto loop inside hashlib, md5 drops the GIL on each block
+                return size, hashlib.file_digest(f, _md5).hexdigest()
+            buf = self.buffers.get()
+            try:
+                md5 = _md5()
+                with memoryview(buf) as view:
+                    while True:
+                        n = f.readinto(buf)
+                        if not n:
+                            break
+                        md5.update(view[:n])
+                return size, md5.hexdigest()
+            finally:
+                self.buffers.put(buf)
+
+    def _read(self):
+        while not self.stop_event.is_set():
+            try:
+                path = self.paths.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                size, digest = self._md5(path)
+                item = (path, size, digest, None)
+            except Exception as e:
+                item = (path, None, None, e)
+            if not self._put(item):
+                return
+        self._put(None)
+
+    def _put(self, item):
+        # bounded put that gives up once the consumer is gone, instead of blocking the reader forever
+        while not self.closed.is_set():
+            try:
+                self.results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter__(self):
+        # yields (path, size, md5, error) in completion order
+        for t in self.readers:
+            t.start()
+        finished = 0
+        try:
+            while finished < len(self.readers):
+                item = self.results.get()
+                if item is None:
+                    finished += 1
+                    continue
+                yield item
+        finally:
+            # break, an exception in the consumer or garbage collection all land here
+            self.closed.set()
+
+
+class _NotifyingQueue(queue.Queue):
+    # wakes the Tk loop when something arrives instead of polling on a timer
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+        self.pending = threading.Event()  # one <<Progress>> in flight is enough, the handler drains everything
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        if not self.pending.is_set():
+            self.pending.set()
+            try:
+                self.root.event_generate('<<Progress>>', when='tail')
+            except (tk.TclError, RuntimeError):  # window already gone
+                self.pending.clear()
+
+
 class TabState:
-    def __init__(self, name):
+    def __init__(self, name, workers=WORKERS):
         self.name = name
         self.src = tk.StringVar(value=str(Path("/home/gostlimoss62/Documents/1A_projects/file_transfer/Folder_A") or Path.cwd()))
         self.dst = tk.StringVar(value=str(Path("/home/gostlimoss62/Documents/1A_projects/file_transfer/Folder_B") or Path.cwd()))
@@ -324,6 +721,8 @@ class TabState:
         self.stop_btn = None
         self.stop_event = threading.Event()
         self.worker_thread = None
+        # one executor per tab, so a stuck upload can't starve local copies; threads start on first use
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name.split()[0].lower())
         self.gdrive_service = None
         self.login_btn = None
 
@@ -333,7 +732,7 @@ class App:
         root.title("File Transferer")
         root.resizable(False, False)
 
-        self.progress_queue = queue.Queue()
+        self.progress_queue = _NotifyingQueue(root)
         self.tab_states = {}
 
         self.tab_sizes = {
@@ -353,7 +752,15 @@ class App:
         width, height = map(int, initial_size_str.split('x'))
         self.center_window(width, height)
 
-        self.root.after(200, self._process_queue)
+        self.root.bind('<<Progress>>', lambda e: self._process_queue())
+        root.protocol("WM_DELETE_WINDOW", self.close)
+
+    def close(self):
+        # the pools' exit hook would otherwise run every queued copy/upload before the process can end
+        for state in self.tab_states.values():
+            state.stop_event.set()
+            state.pool.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
     def center_window(self, width, height):
         screen_width = self.root.winfo_screenwidth()
@@ -511,7 +918,7 @@ class App:
                 state.start_btn.config(state='normal')
                 state.stop_btn.config(state='disabled')
                 return
-            state.worker_thread = GDriveTransfer(src, self.progress_queue, state.stop_event, WORKERS, state.name, state.gdrive_service)
+            state.worker_thread = GDriveTransfer(src, self.progress_queue, state.stop_event, WORKERS, state.name, state.gdrive_service, pool=state.pool)
         else:
             dst = state.dst.get().strip()
             if not dst:
@@ -519,7 +926,7 @@ class App:
                 state.start_btn.config(state='normal')
                 state.stop_btn.config(state='disabled')
                 return
-            state.worker_thread = LocalTransfer(src, dst, self.progress_queue, state.stop_event, WORKERS, state.name)
+            state.worker_thread = LocalTransfer(src, dst, self.progress_queue, state.stop_event, WORKERS, state.name, pool=state.pool)
 
         state.worker_thread.start()
 
@@ -531,6 +938,8 @@ class App:
         state.stop_btn.config(state='disabled')
 
     def _process_queue(self):
+        latest = {}  # only the newest progress message per tab gets drawn
+        self.progress_queue.pending.clear()  # puts from here on raise a new event
         try:
             while True:
                 msg = self.progress_queue.get_nowait()
@@ -542,11 +951,11 @@ class App:
                 phase = msg.get('phase')
 
                 if phase == 'downloading':
-                    pct = msg.get('percent', 0)
-                    name = msg.get('name', '')
-                    state.progress_bar['value'] = pct
-                    state.status_label.config(text=f"Uploading ({pct}%): {name}")
-                elif phase == 'done':
+                    latest[tab_id] = msg
+                    continue
+                latest.pop(tab_id, None)  # a later status/done message wins over queued progress
+
+                if phase == 'done':
                     message = msg.get('message', 'Finished')
                     state.status_label.config(text=message)
                     state.progress_bar['value'] = 100
@@ -580,9 +989,12 @@ class App:
         except queue.Empty:
             pass
         finally:
-            is_any_worker_active = any(s.worker_thread and s.worker_thread.is_alive() for s in self.tab_states.values())
-            delay = 50 if is_any_worker_active else 1000
-            self.root.after(delay, self._process_queue)
+            for tab_id, msg in latest.items():
+                state = self.tab_states[tab_id]
+                pct = msg.get('percent', 0)
+                name = msg.get('name', '')
+                state.progress_bar['value'] = pct
+                state.status_label.config(text=f"Uploading ({pct}%): {name}")
 
 def main():
     root = tk.Tk()
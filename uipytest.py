@@ -1,153 +1,468 @@
-import os, shutil, queue, threading, hashlib
+import os, errno, shutil, queue, threading, hashlib, mmap, atexit, contextlib, sqlite3
+from array import array
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from threading import Lock
 from pathlib import Path
 
+try:
+    import blake3 #SIMD BLAKE3, optional
+except ImportError:
+    blake3 = None
+
 CHUNK_SIZE = 1024 * 1024  # 1 MB
+HASH_BLOCK_SIZE = 1024 * 1024  # 1 MB
+KERNEL_COPY_STEP = 64 * 1024 * 1024  # 64 MB per in-kernel copy call, progress is posted between calls
+SMALL_FILE = 1024 * 1024  # 1 MB, files up to one chunk are handed to workers in batches
+BATCH_SIZE = 32 #small files per pool submission
+COLD_COPY_THRESHOLD = 64 * 1024 * 1024  # 64 MB, larger files are kept out of the page cache
+MTIME_WINDOW_NS = 2 * 10**9  # 2 s, FAT's mtime granularity; exFAT/NTFS/SMB round within it
+DIGEST_CACHE = os.path.join(os.path.expanduser("~"), ".filetransfer-cache.db")
+DIGEST_CACHE_BATCH = 256 #rows written per sqlite transaction
 workers = min(8, max(2, os.cpu_count() or 4))
+COPY_BUFFERS = 2 * workers #1 MB slabs shared by every copy's userspace loop
+
+def _has_sha_ni(): #x86 SHA extensions, OpenSSL's sha256 then beats blake2b
+    try:
+        with open("/proc/cpuinfo") as f:
+            return any(line.startswith("flags") and " sha_ni" in line for line in f)
+    except OSError:
+        return False
+
+_HAS_SHA_NI = _has_sha_ni()
+
+#picked once at import: blake3 if installed, else hardware sha256, else blake2b
+if blake3 is not None:
+    HASH_NAME, HASH_FACTORY = "blake3", blake3.blake3
+elif _HAS_SHA_NI:
+    HASH_NAME, HASH_FACTORY = "sha256", hashlib.sha256
+else:
+    HASH_NAME, HASH_FACTORY = "blake2b", hashlib.blake2b
+
+class BufferPool: #page-aligned slabs carved out of one anonymous mapping, allocated once and reused by every copy
+    def __init__(self, count, size):
+        self.region = mmap.mmap(-1, count * size)
+        view = memoryview(self.region)
+        self.free = queue.LifoQueue() #most recently released slab goes out next, still warm in cache
+        for i in range(count):
+            self.free.put(view[i * size:(i + 1) * size])
+
+    def get(self): #blocks while every slab is in use
+        return self.free.get()
+
+    def put(self, buf):
+        self.free.put(buf)
+
+copy_buffers = BufferPool(COPY_BUFFERS, CHUNK_SIZE)
+
+class DigestCache: #path -> (size, mtime_ns, ctime_ns, digest) in a sqlite sidecar, unchanged files aren't re-read
+    def __init__(self, path):
+        self.path = path
+        self.db = None
+        self.lock = Lock()
+        self.pending = {} #path -> row, None to drop it; written DIGEST_CACHE_BATCH at a time
+
+    def _open(self): #lazily, only checksum runs touch the file; caller holds the lock
+        if self.db is None:
+            try:
+                self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                self.db.execute("PRAGMA journal_mode=WAL")
+                self.db.execute("CREATE TABLE IF NOT EXISTS h(path TEXT PRIMARY KEY, size INT, mtime INT, ctime INT, digest TEXT)")
+                self.db.execute("CREATE TABLE IF NOT EXISTS tree(src TEXT, dst TEXT, src_tree TEXT, dst_tree TEXT, PRIMARY KEY(src, dst))")
+            except sqlite3.Error:
+                self.db = False #unwritable home, everything just gets hashed
+        return self.db
+
+    def get(self, path, st):
+        with self.lock:
+            if path in self.pending:
+                row = self.pending[path]
+            elif self._open():
+                row = self.db.execute("SELECT size, mtime, ctime, digest FROM h WHERE path = ?", (path,)).fetchone()
+            else:
+                row = None
+        #ctime catches rewrites that kept size and mtime; the digest's algorithm tag makes a different HASH_NAME a miss
+        if row and row[:3] == (st.st_size, st.st_mtime_ns, st.st_ctime_ns) and row[3].startswith(HASH_NAME + ":"):
+            return row[3]
+        return None
+
+    def put(self, path, st, digest):
+        self._stage(path, (st.st_size, st.st_mtime_ns, st.st_ctime_ns, digest))
+
+    def discard(self, path): #the file was rewritten under us
+        self._stage(path, None)
+
+    def _stage(self, path, row):
+        with self.lock:
+            self.pending[path] = row
+            if len(self.pending) >= DIGEST_CACHE_BATCH:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def get_tree(self, src, dst): #(src_tree, dst_tree) recorded after the last clean checksum sync of this pair
+        with self.lock:
+            if not self._open():
+                return None
+            return self.db.execute("SELECT src_tree, dst_tree FROM tree WHERE src = ? AND dst = ?", (src, dst)).fetchone()
+
+    def put_tree(self, src, dst, src_tree, dst_tree):
+        with self.lock:
+            if not self._open():
+                return
+            try:
+                self.db.execute("INSERT OR REPLACE INTO tree VALUES (?, ?, ?, ?)", (src, dst, src_tree, dst_tree))
+            except sqlite3.Error:
+                pass
+
+    def _flush(self): #one transaction per batch instead of an fsync per row
+        rows, self.pending = self.pending, {}
+        if not rows or not self._open():
+            return
+        try:
+            with self.db:
+                self.db.execute("BEGIN")
+                self.db.executemany("INSERT OR REPLACE INTO h VALUES (?, ?, ?, ?, ?)", [(p, *r) for p, r in rows.items() if r is not None])
+                self.db.executemany("DELETE FROM h WHERE path = ?", [(p,) for p, r in rows.items() if r is None])
+        except sqlite3.Error:
+            pass #the cache is an optimization, losing a batch only costs a re-hash
+
+digest_cache = DigestCache(DIGEST_CACHE)
+atexit.register(digest_cache.flush)
+
+def advise(fd, advice): #posix_fadvise over the whole file, where the platform has it
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+
+def _walk(root, rel=""): #recursive scandir, yields (path, rel_dir, stat) per file; stat is None when it can't be read
+    try:
+        it = os.scandir(root)
+    except OSError as e: #unreadable folder, skipped like os.walk did
+        print(f"Skipped folder {root}: {e}")
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path, os.path.join(rel, entry.name))
+            elif not entry.is_dir(): #like os.walk, symlinked folders aren't followed
+                try:
+                    st = entry.stat() #cached on the DirEntry, free on Windows
+                except OSError:
+                    st = None
+                yield entry.path, rel, st
+
+def _tree_term(path, rel, st): #one file's share of a tree digest; terms are summed, so scandir order doesn't matter
+    key = f"{rel}/{os.path.basename(path)}\0{st.st_size}\0{st.st_mtime_ns}\0{st.st_ctime_ns}".encode(errors="surrogateescape")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=16).digest(), "little")
+
+def _tree_hex(total):
+    return f"{total & ((1 << 128) - 1):032x}"
+
+def _tree_digest(root): #digest of every file's (path, size, mtime, ctime) under root, None if something can't be stat'ed
+    total = 0
+    for path, rel, st in _walk(root):
+        if st is None:
+            return None
+        total += _tree_term(path, rel, st)
+    return _tree_hex(total)
+
+def kernel_copy(src_fd, dst_fd, size, advance, stop_event): #copy_file_range, then sendfile; returns bytes copied, fd positions follow
+    sent = 0
+    use_range = hasattr(os, "copy_file_range") #reflink/copy offload on XFS/Btrfs/NFS
+    use_sendfile = hasattr(os, "sendfile")
+    sendfile_used = False
+    while sent < size and (use_range or use_sendfile) and not stop_event.is_set():
+        count = min(KERNEL_COPY_STEP, size - sent)
+        try:
+            if use_range:
+                n = os.copy_file_range(src_fd, dst_fd, count)
+            else:
+                #explicit offset, only Linux accepts None; src's position doesn't move, fixed up below
+                sendfile_used = True
+                n = os.sendfile(dst_fd, src_fd, sent, count)
+        except OSError as e:
+            #ENOTSOCK: macOS sendfile only writes to sockets
+            if e.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOTSOCK):
+                raise
+            if use_range:
+                use_range = False
+            else:
+                use_sendfile = False
+            continue
+        if n == 0:
+            break
+        sent += n
+        advance(n)
+    if sendfile_used:
+        os.lseek(src_fd, sent, os.SEEK_SET)
+        os.lseek(dst_fd, sent, os.SEEK_SET)
+    return sent
 
 class transfer(threading.Thread):
-    def __init__(self, src, dst, progress_queue, stop_event, workers):
+    def __init__(self, src, dst, progress_queue, stop_event, workers, verify_checksum=False, pool=None):
         super().__init__(daemon=True)
         self.src = Path(src).resolve()
         self.dst = Path(dst).resolve()
         self.progress_queue = progress_queue
         self.stop_event = stop_event
         self.workers = workers
+        self.verify_checksum = verify_checksum #hash files that size+mtime call unchanged
+        self.pool = pool #long-lived executor owned by the caller, reused across runs
+        self.progress_state = None #latest (percent, name), polled by the GUI; the queue only carries terminal messages
+
+    def executor(self): #the shared pool when there is one, else a pool for this run only
+        if self.pool is not None:
+            return contextlib.nullcontext(self.pool)
+        return ThreadPoolExecutor(max_workers=self.workers)
 
     @staticmethod
-    def file_hash(path, block_size=65536):
-        md5 = hashlib.md5()
+    def file_hash(path, block_size=HASH_BLOCK_SIZE):
         with open(path, "rb") as f:
+            h = HASH_FACTORY()
+            try: #whole file mapped and hashed in one update, kernel readahead and no copies into bytes
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, "madvise"):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    h.update(mm)
+                return f"{HASH_NAME}:{h.hexdigest()}"
+            except (ValueError, OSError): #empty or unmappable (special files, 32-bit address space), read it instead
+                pass
+            if hasattr(hashlib, "file_digest"): #3.11+, read loop runs inside hashlib
+                return f"{HASH_NAME}:{hashlib.file_digest(f, HASH_FACTORY).hexdigest()}"
             for chunk in iter(lambda: f.read(block_size), b""):
-                md5.update(chunk)
-        return md5.hexdigest()
+                h.update(chunk)
+        return f"{HASH_NAME}:{h.hexdigest()}" #tagged, digests from different algorithms never compare equal
 
     @staticmethod
-    def needs_update(src_path: Path, dst_path: Path) -> bool:
-        if not dst_path.exists():
-            return True
+    def cached_hash(path, st): #file_hash, served from the sidecar while size and mtime match st
+        path = os.fspath(path)
+        digest = digest_cache.get(path, st)
+        if digest is None:
+            digest = transfer.file_hash(path)
+            digest_cache.put(path, st, digest)
+        return digest
+
+    @staticmethod
+    def needs_update(src_path: Path, dst_path: Path, verify_checksum: bool = False, src_st=None) -> bool:
+        #same size and dst not older means up to date, like rsync; contents only compared on request
+        #src_st: the walker's stat of src
         try:
-            if src_path.stat().st_size != dst_path.stat().st_size:
-                return True
-            if int(src_path.stat().st_mtime) > int(dst_path.stat().st_mtime):
-                return True
-        except Exception:
-            pass
+            if src_st is None:
+                src_st = os.stat(src_path)
+            dst_st = os.stat(dst_path)
+        except OSError:
+            return True
+        if src_st.st_size != dst_st.st_size:
+            return True
+        if src_st.st_mtime_ns - dst_st.st_mtime_ns > MTIME_WINDOW_NS: #coarse destination clocks don't count as newer
+            return True
+        if not verify_checksum:
+            return False
         try:
-            return transfer.file_hash(src_path) != transfer.file_hash(dst_path)
+            return transfer.cached_hash(src_path, src_st) != transfer.cached_hash(dst_path, dst_st)
         except Exception:
             return True
 
+    def decide(self, src_file, dst_file, src_st=None): #first pipeline stage: stat, and hash both sides in checksum mode
+        return "copy" if transfer.needs_update(src_file, dst_file, self.verify_checksum, src_st) else "skip"
+
+    def skip_file(self, src_file, totalsize: int, current_size: list): #skipped files still move the label
+        pct = current_size[0] * 100 // totalsize if totalsize else 100
+        self.progress_state = (pct, os.path.basename(src_file))
+        return ("skipped", f"Skipped: {src_file}")
+
     def copy_file_with_progress(self, src_file: Path, dst_file: Path,totalsize: int, current_size: list, lock: Lock):
         if self.stop_event.is_set():
             return ("cancelled", f"Cancelled: {src_file}")
 
         try:
             dst_file.parent.mkdir(parents=True, exist_ok=True)
-            src_size = src_file.stat().st_size
+
+            step = max(totalsize // 100, 1) #bytes worth one percent of the whole transfer
+            pending = 0
+
+            def advance(n, final=False): #counts locally, touches the shared counter about once per percent
+                nonlocal pending
+                pending += n
+                if pending < step and not (final and pending):
+                    return
+                with lock:
+                    current_size[0] += pending
+                    pct = current_size[0] * 100 // totalsize #integer only, same floor as int(x / t * 100) without float rounding
+                    post = pct != current_size[1]
+                    current_size[1] = pct
+                pending = 0
+                if post: #only percent changes are published
+                    self.progress_state = (pct, src_file.name) #single attribute store, atomic
+
             with src_file.open("rb") as fsrc, dst_file.open("wb") as fdst:
-                while True:
-                    if self.stop_event.is_set():
-                        return ("cancelled", f"Cancelled: {src_file}")
-                    chunk = fsrc.read(CHUNK_SIZE)
-                    if not chunk:
-                        break
-                    fdst.write(chunk)
-
-                    with lock:
-                        current_size[0] += len(chunk)
-                        pct = int(current_size[0] / totalsize * 100)
-                        self.progress_queue.put({
-                            "phase": "downloading",
-                            "percent": pct,
-                            "name": src_file.name
-                        })
+                src_size = os.fstat(fsrc.fileno()).st_size #on the open fd, no second path lookup
+                if src_size > COLD_COPY_THRESHOLD:
+                    advise(fsrc.fileno(), "POSIX_FADV_SEQUENTIAL")
+                #kernel moves the bytes where it can, the python loop picks up whatever is left
+                kernel_copy(fsrc.fileno(), fdst.fileno(), src_size, advance, self.stop_event)
+                buf = copy_buffers.get()
+                try:
+                    while True:
+                        if self.stop_event.is_set():
+                            return ("cancelled", f"Cancelled: {src_file}")
+                        n = fsrc.readinto(buf)
+                        if not n:
+                            break
+                        fdst.write(buf[:n])
+                        advance(n)
+                finally:
+                    copy_buffers.put(buf)
+                advance(0, final=True)
+                if src_size > COLD_COPY_THRESHOLD: #one-shot data, don't let it push everything else out of the cache
+                    fdst.flush()
+                    advise(fsrc.fileno(), "POSIX_FADV_DONTNEED")
+                    advise(fdst.fileno(), "POSIX_FADV_DONTNEED") #starts writeback, drops what's already clean
 
             try:
                 shutil.copystat(src_file, dst_file)
             except Exception:
                 pass
+            if self.verify_checksum: #dst may keep its old size and mtime, don't let the stale digest survive
+                digest_cache.discard(os.fspath(dst_file))
 
             return ("updated", f"Updated: {src_file}")
         except Exception as e:
             return ("error", f"Error copying {src_file}: {e}")
 
-    def process_file(self, src_file: Path, dst_file: Path, totalsize: int,current_size: list, lock: Lock):
+    def process_file(self, src_file: Path, dst_file: Path, totalsize: int,current_size: list, lock: Lock, src_st=None):
         if self.stop_event.is_set():
             return ("cancelled", f"Cancelled: {src_file}")
 
         try:
-            if transfer.needs_update(src_file, dst_file):
+            src_file, dst_file = Path(src_file), Path(dst_file) #sync_folder hands over plain strings
+            if self.decide(src_file, dst_file, src_st) == "copy":
                 return self.copy_file_with_progress(src_file, dst_file, totalsize, current_size, lock)
             else:
-                with lock:
-                    pct = int(current_size[0] / totalsize * 100) if totalsize else 100
-                    self.progress_queue.put({
-                        "phase": "downloading",
-                        "percent": pct,
-                        "name": src_file.name
-                    })
-                return ("skipped", f"Skipped: {src_file}")
+                return self.skip_file(src_file, totalsize, current_size)
         except Exception as e:
             return ("error", f"Error processing {src_file}: {e}")
 
-    def sync_folder(self):
-        dst_root = self.dst.joinpath(self.src.name)
-        dst_root.mkdir(parents=True, exist_ok=True)
+    def process_batch(self, batch, totalsize: int, current_size: list, lock: Lock): #many small files in one submission
+        results = []
+        for src_file, dst_file, src_st in batch:
+            results.append(self.process_file(src_file, dst_file, totalsize, current_size, lock, src_st))
+        return results
 
-        tasks = []
-        totalsize = 0
-        for root, _, files in os.walk(self.src):
-            rel = os.path.relpath(root, self.src)
-            for f in files:
-                s = Path(root) / f
-                d = dst_root.joinpath(rel) / f
-                tasks.append((s, d))
+    def pipeline(self, executor, order, src_paths, dst_paths, stats, totalsize: int, current_size: list, lock: Lock, results: list):
+        #checksum mode: decide (hash reads) on its own pool while executor copies whatever was already decided,
+        #so the hashing of one file overlaps the copy of another instead of running as a separate pass
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="decide") as decide_pool:
+            decisions = {decide_pool.submit(self.decide, src_paths[i], dst_paths[i], stats[i]): i for i in order}
+            for fut in as_completed(decisions):
+                if self.stop_event.is_set():
+                    for d in decisions:
+                        d.cancel()
+                    break
+                i = decisions[fut]
                 try:
-                    totalsize += s.stat().st_size
+                    verdict = fut.result()
                 except Exception:
-                    pass
+                    verdict = "copy"
+                if verdict == "copy":
+                    futures.append(executor.submit(self.copy_file_with_progress, Path(src_paths[i]), Path(dst_paths[i]), totalsize, current_size, lock))
+                else:
+                    results.append(self.skip_file(src_paths[i], totalsize, current_size))
+        return futures
+
+    def sync_folder(self):
+        dst_root = self.dst.joinpath(self.src.name)
+        dst_root.mkdir(parents=True, exist_ok=True)
 
-        if totalsize == 0 and tasks:
+        #one scandir pass into parallel lists (no Path objects until a worker picks the file up)
+        src_paths = []
+        dst_paths = []
+        stats = []
+        sizes = array('q')
+        dst_root_str = str(dst_root)
+        tree = 0 if self.verify_checksum else None #source tree digest, built from the stats the walk already has
+        for path, rel, st in _walk(self.src):
+            src_paths.append(path)
+            dst_paths.append(os.path.join(dst_root_str, rel, os.path.basename(path)))
+            stats.append(st)
+            sizes.append(st.st_size if st is not None else 0)
+            if tree is not None:
+                tree = tree + _tree_term(path, rel, st) if st is not None else None
+        totalsize = sum(sizes)
+        src_tree = _tree_hex(tree) if tree is not None else None
+
+        if totalsize == 0 and src_paths:
             totalsize = 1
 
+        #checksum mode only, where it saves hashing: neither side moved since the last clean checksum sync of this pair,
+        #so the per-file hashes can't have changed either (the dst walk still stats every file, like a plain sync would)
+        tree_key = (str(self.src), dst_root_str)
+        stored = digest_cache.get_tree(*tree_key) if src_tree is not None else None
+        if stored and stored[0] == src_tree and stored[1] == _tree_digest(dst_root_str):
+            self.progress_state = (100, self.src.name)
+            results = [("skipped", f"Skipped: {p}") for p in src_paths]
+        else:
+            results = self.dispatch(src_paths, dst_paths, stats, sizes, totalsize)
+            if src_tree is not None and not self.stop_event.is_set() and all(r[0] != "error" for r in results):
+                digest_cache.put_tree(*tree_key, src_tree, _tree_digest(dst_root_str))
+
+        updated = sum(1 for r in results if r[0] == "updated")
+        skipped = sum(1 for r in results if r[0] == "skipped")
+        errors = sum(1 for r in results if r[0] == "error")
+        cancelled = sum(1 for r in results if r[0] == "cancelled")
+
+        print(f"\n--- Sync Summary for {self.src} ---")
+        print(f"{updated} updated, {skipped} skipped, {errors} errors, {cancelled} cancelled")
+
+        return results
+
+    def dispatch(self, src_paths, dst_paths, stats, sizes, totalsize: int): #per-file decide and copy over the pool
         lock = Lock()
-        current_size = [0]
+        current_size = [0, -1] #bytes copied, last percent posted
         results = []
 
-        with ThreadPoolExecutor(max_workers=self.workers) as executor:
-            futures = [executor.submit(self.process_file, s, d, totalsize, current_size, lock) for s, d in tasks]
+        #small files go out BATCH_SIZE per submission so the pool's per-task overhead doesn't dominate
+        #large files go first, biggest first, so one late giant doesn't become the straggler
+        order = sorted(range(len(sizes)), key=sizes.__getitem__, reverse=True)
+        with self.executor() as executor:
+            if self.verify_checksum:
+                futures = self.pipeline(executor, order, src_paths, dst_paths, stats, totalsize, current_size, lock, results)
+            else:
+                large = [i for i in order if sizes[i] > SMALL_FILE]
+                small = [(src_paths[i], dst_paths[i], stats[i]) for i in order if sizes[i] <= SMALL_FILE]
+                futures = [executor.submit(self.process_file, src_paths[i], dst_paths[i], totalsize, current_size, lock, stats[i]) for i in large]
+                futures += [executor.submit(self.process_batch, small[i:i + BATCH_SIZE], totalsize, current_size, lock) for i in range(0, len(small), BATCH_SIZE)]
             for fut in futures:
                 try:
                     res = fut.result()
                 except Exception as e:
                     res = ("error", f"Worker exception: {e}")
-                results.append(res)
+                if isinstance(res, list):
+                    results.extend(res)
+                else:
+                    results.append(res)
                 if self.stop_event.is_set():
                     break
-
-        updated = sum(1 for r in results if r[0] == "updated")
-        skipped = sum(1 for r in results if r[0] == "skipped")
-        errors = sum(1 for r in results if r[0] == "error")
-        cancelled = sum(1 for r in results if r[0] == "cancelled")
-
-        print(f"\n--- Sync Summary for {self.src} ---")
-        print(f"{updated} updated, {skipped} skipped, {errors} errors, {cancelled} cancelled")
-
+            if self.stop_event.is_set(): #a shared pool outlives this run, drop what's still queued
+                for fut in futures:
+                    fut.cancel()
+                wait(futures)
         return results
 
     def sync_file(self):
         dst_file = self.dst.joinpath(self.src.name)
         try:
-            totalsize = self.src.stat().st_size
+            src_st = self.src.stat() #reused by needs_update
+            totalsize = src_st.st_size
         except Exception:
-            totalsize = 1
+            src_st, totalsize = None, 1
         lock = Lock()
-        current_size = [0]
-        res = self.process_file(self.src, dst_file, totalsize, current_size, lock)
+        current_size = [0, -1] #bytes copied, last percent posted
+        res = self.process_file(self.src, dst_file, totalsize, current_size, lock, src_st)
         return [res]
 
     def run(self):
@@ -173,20 +488,27 @@ class transfer(threading.Thread):
                     self.progress_queue.put({"phase": "done"})
         except Exception as e:
             self.progress_queue.put({"phase": "error", "message": str(e)})
+        finally:
+            if self.verify_checksum:
+                digest_cache.flush()
 
 
 class App:
     def __init__(self, root):
         self.root = root
         root.title("File Transferer(chunk)")
-        root.geometry("395x210")
+        root.geometry("395x235")
         
 
         self.progress_queue = queue.Queue()
         self.stop_event = threading.Event()
         self.worker = None
+        self.shown_progress = None
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="xfer") #created once, every transfer reuses its threads
+        root.protocol("WM_DELETE_WINDOW", self.close)
         self.out_src = tk.StringVar(value=str(Path.cwd()))
         self.out_dst = tk.StringVar(value=str(Path.cwd()))
+        self.verify_checksum = tk.BooleanVar(value=False)
 
         style = ttk.Style()
         style.theme_use("classic")
@@ -218,6 +540,9 @@ class App:
         self.stop_btn = ttk.Button(frm, text="Cancel", command=self.cancel_transfer, state='disabled')
         self.stop_btn.grid(row=7, column=1, sticky='we')
 
+        #content check for files size+mtime call unchanged
+        ttk.Checkbutton(frm, text="Verify contents (checksum)", variable=self.verify_checksum).grid(row=8, column=0, columnspan=2, sticky='w')
+
         self.root.after(200, self._process_queue)
 
     def browse_src(self):
@@ -245,13 +570,19 @@ class App:
         
         self.progress['value'] = 0
         self.status_label.config(text="Starting...")
+        self.shown_progress = None
 
         self.start_btn.config(state='disabled')
         self.stop_btn.config(state='normal')
         self.stop_event.clear()
-        self.worker = transfer(src, dst, self.progress_queue, self.stop_event)
+        self.worker = transfer(src, dst, self.progress_queue, self.stop_event, workers, self.verify_checksum.get(), pool=self.pool)
         self.worker.start()
 
+    def close(self): #the pool's exit hook would otherwise run every queued copy before the process can end
+        self.stop_event.set()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
     def cancel_transfer(self):
         if not self.worker:
             return
@@ -261,23 +592,31 @@ class App:
 
     def _process_queue(self):
         try:
+            #progress is read once per tick from the worker, before any terminal message can replace it
+            state = self.worker.progress_state if self.worker else None
+            if state is not None and state != self.shown_progress:
+                pct, name = state
+                self.progress['value'] = pct
+                self.status_label.config(text=f"Copying({pct}%): {name}")
+                self.shown_progress = state
+
             while True:
                 msg = self.progress_queue.get_nowait()
                 phase = msg.get('phase')
 
-                if phase == 'downloading':
-                    pct = msg.get('percent', 0)
-                    name = msg.get('name', '')
-                    self.progress['value'] = pct
-                    self.status_label.config(text=f"Copying({pct}%): {name}")
-
-                elif phase == 'done':
+                if phase == 'done':
                     self.status_label.config(text="Finished")
                     self.progress['value'] = 100
                     self.start_btn.config(state='normal')
                     self.stop_btn.config(state='disabled')
                     self.worker = None
 
+                elif phase == 'cancelled':
+                    self.status_label.config(text="Cancelled")
+                    self.start_btn.config(state='normal')
+                    self.stop_btn.config(state='disabled')
+                    self.worker = None
+
                 elif phase == 'error':
                     msgtxt = msg.get('message', 'Unknown error')
                     self.status_label.config(text=f"Error: {msgtxt}")